@@ -1 +1,223 @@
-from .cao_lang_py import *
+import collections
+import functools
+import hashlib
+import json
+import re
+import threading
+
+from .cao_lang_py import (
+    CaoProgram,
+    CompilationOptions,
+    CompilationUnit,
+    cao_lang_prop_types,
+    compile,
+    compile_many,
+    native_version,
+    run,
+)
+
+__all__ = [
+    "CaoProgram",
+    "CompilationOptions",
+    "CompilationUnit",
+    "cao_lang_prop_types",
+    "compile",
+    "compile_from_dict",
+    "compile_many",
+    "native_version",
+    "run",
+]
+
+try:
+    import orjson as _orjson
+except ImportError:
+    _orjson = None
+
+try:
+    from yaml import CSafeLoader as _CSafeLoader
+    from yaml import YAMLError as _YamlError
+    from yaml import load as _yaml_load
+    from yaml.constructor import ConstructorError as _YamlConstructorError
+except ImportError:
+    _YamlLoader = None
+else:
+
+    class _YamlLoader(_CSafeLoader):
+        """
+        libyaml backed loader resolving plain scalars by the YAML 1.2 core schema
+
+        PyYAML implements YAML 1.1, which reads e.g. `010` as octal and `1:30` as
+        sexagesimal. The native parser follows YAML 1.2, so those resolvers are
+        replaced.
+        """
+
+        def construct_mapping(self, node, deep=False):
+            # PyYAML keeps the last of duplicated keys, the native parser rejects them
+            keys = set()
+            for key_node, _ in node.value:
+                key = self.construct_object(key_node, deep=deep)
+                if key in keys:
+                    raise _YamlConstructorError(
+                        "while constructing a mapping",
+                        node.start_mark,
+                        f"found duplicate key {key!r}",
+                        key_node.start_mark,
+                    )
+                keys.add(key)
+            return super().construct_mapping(node, deep=deep)
+
+    _YamlLoader.yaml_implicit_resolvers = {}
+    _YamlLoader.add_implicit_resolver(
+        "tag:yaml.org,2002:null",
+        re.compile(r"^(?:~|null|Null|NULL|)$"),
+        ["~", "n", "N", ""],
+    )
+    _YamlLoader.add_implicit_resolver(
+        "tag:yaml.org,2002:bool",
+        re.compile(r"^(?:true|True|TRUE|false|False|FALSE)$"),
+        list("tTfF"),
+    )
+    _YamlLoader.add_implicit_resolver(
+        "tag:yaml.org,2002:int",
+        re.compile(r"^(?:[-+]?[0-9]+|0o[0-7]+|0x[0-9a-fA-F]+)$"),
+        list("-+0123456789"),
+    )
+    _YamlLoader.add_implicit_resolver(
+        "tag:yaml.org,2002:float",
+        re.compile(r"^[-+]?(?:\.[0-9]+|[0-9]+(?:\.[0-9]*)?)(?:[eE][-+]?[0-9]+)?$"),
+        list("-+.0123456789"),
+    )
+    # JSON can not represent these, the tag has no constructor so loading fails and the
+    # native parser is used instead
+    _YamlLoader.add_implicit_resolver(
+        "tag:cao-lang,nonfinite",
+        re.compile(r"^(?:[-+]?\.(?:inf|Inf|INF)|\.(?:nan|NaN|NAN))$"),
+        list("-+."),
+    )
+
+    def _construct_yaml12_int(loader, node):
+        value = loader.construct_scalar(node)
+        if value.startswith("0o"):
+            return int(value[2:], 8)
+        if value.startswith("0x"):
+            return int(value[2:], 16)
+        return int(value, 10)
+
+    def _construct_yaml12_bool(loader, node):
+        return loader.construct_scalar(node).lower() == "true"
+
+    _YamlLoader.add_constructor("tag:yaml.org,2002:int", _construct_yaml12_int)
+    _YamlLoader.add_constructor("tag:yaml.org,2002:bool", _construct_yaml12_bool)
+
+_native_from_json = CompilationUnit.from_json
+_native_from_json_bytes = CompilationUnit.from_json_bytes
+_native_from_yaml = CompilationUnit.from_yaml
+_native_from_yaml_bytes = CompilationUnit.from_yaml_bytes
+
+# the native version can not change during the lifetime of the process
+native_version = functools.lru_cache(maxsize=1)(native_version)
+
+PARSE_CACHE_SIZE = 512
+
+# compile() copies the options it receives, so a single default instance can be shared.
+# Callers that want to modify the options should construct their own instance.
+_DEFAULT_OPTIONS = CompilationOptions()
+CompilationOptions.default = classmethod(lambda cls: _DEFAULT_OPTIONS)
+
+
+def _parse_cache(parse):
+    """
+    Cache the CompilationUnits returned by `parse`, keyed by the hash of the source text
+
+    The source may be a `str`, `bytes`, `bytearray` or `memoryview`. `parse` receives
+    `str` sources as is and every other source as `bytes`.
+    CompilationUnits are immutable from Python, so cached instances are shared.
+    """
+    cache = collections.OrderedDict()
+    lock = threading.Lock()
+
+    @functools.wraps(parse)
+    def wrapper(payload):
+        if isinstance(payload, str):
+            key = hashlib.blake2b(payload.encode(), digest_size=16).digest()
+        elif isinstance(payload, (bytes, bytearray, memoryview)):
+            key = hashlib.blake2b(payload, digest_size=16).digest()
+        else:
+            raise TypeError(
+                f"expected str or a bytes-like object, got {type(payload).__name__}"
+            )
+        with lock:
+            unit = cache.get(key)
+            if unit is not None:
+                cache.move_to_end(key)
+                return unit
+        if not isinstance(payload, (str, bytes)):
+            # the native parsers only borrow from `bytes` objects
+            payload = memoryview(payload).tobytes()
+        unit = parse(payload)
+        with lock:
+            cache[key] = unit
+            if len(cache) > PARSE_CACHE_SIZE:
+                cache.popitem(last=False)
+        return unit
+
+    def cache_clear():
+        with lock:
+            cache.clear()
+
+    wrapper.cache_clear = cache_clear
+    return wrapper
+
+
+def _dump_json(program):
+    """
+    Serialize a JSON-like Python object
+
+    Uses orjson, producing `bytes`, if it is installed, falling back to the standard
+    library otherwise. Non-`str` keys are converted to strings by both.
+    """
+    if _orjson is not None:
+        return _orjson.dumps(program, option=_orjson.OPT_NON_STR_KEYS)
+    return json.dumps(program)
+
+
+def _unit_from_json(payload):
+    if isinstance(payload, str):
+        return _native_from_json(payload)
+    return _native_from_json_bytes(payload)
+
+
+def compile_from_dict(program, options=None):
+    """
+    Compile a program given as a JSON-like Python object (dicts, lists, scalars)
+    """
+    return compile(_unit_from_json(_dump_json(program)), options)
+
+
+def _from_yaml(payload):
+    """
+    Parse a CompilationUnit from a YAML encoded `str` or `bytes`
+
+    If PyYAML was built with libyaml the document is parsed in C and handed to the
+    native JSON parser, otherwise, or if that fails, the native YAML parser is used.
+    """
+    if _YamlLoader is not None:
+        try:
+            payload_json = _dump_json(_yaml_load(payload, Loader=_YamlLoader))
+        except (_YamlError, TypeError, ValueError):
+            # let the native parser produce the error message
+            pass
+        else:
+            try:
+                return _unit_from_json(payload_json)
+            except ValueError:
+                # PyYAML types scalars without knowing the schema, e.g. `name: 1` is an
+                # int, while the native parser reads it as text when it expects a string
+                pass
+    if isinstance(payload, str):
+        return _native_from_yaml(payload)
+    return _native_from_yaml_bytes(payload)
+
+
+CompilationUnit.from_json = staticmethod(_parse_cache(_unit_from_json))
+CompilationUnit.from_yaml = staticmethod(_parse_cache(_from_yaml))
@@ -5,6 +5,7 @@ use pyo3::{
     prelude::*,
     wrap_pyfunction,
 };
+use rayon::prelude::*;
 
 #[pyclass]
 #[derive(Clone)]
@@ -27,12 +28,26 @@ impl CompilationUnit {
         Ok(Self { inner })
     }
 
+    #[staticmethod]
+    fn from_json_bytes(payload: &[u8]) -> PyResult<Self> {
+        let inner = serde_json::from_slice(payload)
+            .map_err(|err| PyValueError::new_err(err.to_string()))?;
+        Ok(Self { inner })
+    }
+
     #[staticmethod]
     fn from_yaml(payload: &str) -> PyResult<Self> {
         let inner =
             serde_yaml::from_str(payload).map_err(|err| PyValueError::new_err(err.to_string()))?;
         Ok(Self { inner })
     }
+
+    #[staticmethod]
+    fn from_yaml_bytes(payload: &[u8]) -> PyResult<Self> {
+        let inner = serde_yaml::from_slice(payload)
+            .map_err(|err| PyValueError::new_err(err.to_string()))?;
+        Ok(Self { inner })
+    }
 }
 
 #[pymethods]
@@ -51,20 +66,49 @@ pub struct CaoProgram {
 }
 
 #[pyfunction]
-fn compile(cu: CompilationUnit, options: Option<CompilationOptions>) -> PyResult<CaoProgram> {
-    cao_lang::prelude::compile(cu.inner, options.map(|o| o.inner))
+fn compile(
+    py: Python,
+    cu: CompilationUnit,
+    options: Option<CompilationOptions>,
+) -> PyResult<CaoProgram> {
+    py.allow_threads(move || cao_lang::prelude::compile(cu.inner, options.map(|o| o.inner)))
         .map_err(|err| PyValueError::new_err(err.to_string()))
         .map(|inner| CaoProgram {
             inner: Arc::new(inner),
         })
 }
 
+/// Compile a list of CompilationUnits in parallel, without holding the GIL
+#[pyfunction]
+fn compile_many(
+    py: Python,
+    units: Vec<CompilationUnit>,
+    options: Option<CompilationOptions>,
+) -> PyResult<Vec<CaoProgram>> {
+    let options = options.map(|o| o.inner);
+    py.allow_threads(move || {
+        units
+            .into_par_iter()
+            .enumerate()
+            .map(|(i, cu)| {
+                cao_lang::prelude::compile(cu.inner, options.clone())
+                    .map(|inner| CaoProgram {
+                        inner: Arc::new(inner),
+                    })
+                    .map_err(|err| format!("unit {}: {}", i, err))
+            })
+            .collect::<Result<Vec<_>, _>>()
+    })
+    .map_err(PyValueError::new_err)
+}
+
 #[pyfunction]
-fn run(prog: CaoProgram) -> PyResult<()> {
-    let mut vm = cao_lang::prelude::Vm::new(()).expect("Failed to init vm");
-    vm.run(&prog.inner)
-        .map_err(|err| PyRuntimeError::new_err(err.to_string()))
-        .map(|_| ())
+fn run(py: Python, prog: CaoProgram) -> PyResult<()> {
+    py.allow_threads(move || {
+        let mut vm = cao_lang::prelude::Vm::new(()).expect("Failed to init vm");
+        vm.run(&prog.inner).map_err(|err| err.to_string())
+    })
+    .map_err(PyRuntimeError::new_err)
 }
 
 /// Return the version of the native Cao-Lang used
@@ -85,6 +129,7 @@ fn cao_lang_prop_types() -> Vec<String> {
 #[pymodule]
 fn cao_lang_py(_py: Python, m: &PyModule) -> PyResult<()> {
     m.add_function(wrap_pyfunction!(compile, m)?)?;
+    m.add_function(wrap_pyfunction!(compile_many, m)?)?;
     m.add_function(wrap_pyfunction!(run, m)?)?;
     m.add_function(wrap_pyfunction!(native_version, m)?)?;
     m.add_function(wrap_pyfunction!(cao_lang_prop_types, m)?)?;
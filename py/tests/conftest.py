@@ -0,0 +1,26 @@
+import pytest
+
+import cao_lang as caoc
+
+
+@pytest.fixture(scope="session")
+def compile_yaml():
+    """
+    Return a function compiling YAML sources into programs
+
+    Parsing is already cached by CompilationUnit.from_yaml, this caches the compiled
+    program, so tests sharing a source compile it once per session.
+    """
+    programs = {}
+
+    def compile_yaml(source):
+        program = programs.get(source)
+        if program is None:
+            program = caoc.compile(
+                caoc.CompilationUnit.from_yaml(source),
+                caoc.CompilationOptions.default(),
+            )
+            programs[source] = program
+        return program
+
+    return compile_yaml
@@ -1,12 +1,9 @@
-import cao_lang as caoc
+import pytest
 
+import cao_lang as caoc
 
-def test_compile_and_run():
-    """
-    Test if we can take a simple program and parse, compile and run it without error
-    """
 
-    PROGRAM_YAML = """
+ADD_PROGRAM_YAML = """
 lanes:
     - cards:
         - ty: ScalarInt
@@ -16,14 +13,240 @@ lanes:
         - ty: Add
 """
 
-    program = caoc.CompilationUnit.from_yaml(PROGRAM_YAML)
-    options = caoc.CompilationOptions()
 
-    program = caoc.compile(program, options)
+def test_compile_and_run(compile_yaml):
+    """
+    Test if we can take a simple program and parse, compile and run it without error
+    """
+    program = compile_yaml(ADD_PROGRAM_YAML)
 
     caoc.run(program)
 
 
+def test_compile_yaml_shares_programs(compile_yaml):
+    assert compile_yaml(ADD_PROGRAM_YAML) is compile_yaml(ADD_PROGRAM_YAML)
+
+
+def test_default_options_are_shared():
+    assert caoc.CompilationOptions.default() is caoc.CompilationOptions.default()
+
+
 def test_get_version():
     v = caoc.native_version()
     assert isinstance(v, str)
+
+
+def test_get_version_is_memoized():
+    caoc.native_version()
+    hits = caoc.native_version.cache_info().hits
+
+    caoc.native_version()
+
+    assert caoc.native_version.cache_info().hits == hits + 1
+
+
+def test_parse_is_cached():
+    PROGRAM_JSON = '{"lanes": [{"cards": [{"ty": "ScalarInt", "val": 1}]}]}'
+
+    a = caoc.CompilationUnit.from_json(PROGRAM_JSON)
+    b = caoc.CompilationUnit.from_json(PROGRAM_JSON)
+
+    assert a is b
+
+
+def test_parse_cache_evicts_oldest(monkeypatch):
+    monkeypatch.setattr(caoc, "PARSE_CACHE_SIZE", 2)
+    caoc.CompilationUnit.from_json.cache_clear()
+
+    sources = [
+        '{"lanes": [{"cards": [{"ty": "ScalarInt", "val": %d}]}]}' % i for i in range(3)
+    ]
+    units = [caoc.CompilationUnit.from_json(source) for source in sources]
+
+    assert caoc.CompilationUnit.from_json(sources[2]) is units[2]
+    assert caoc.CompilationUnit.from_json(sources[0]) is not units[0]
+
+
+def test_compile_from_dict():
+    program = {
+        "lanes": [
+            {
+                "cards": [
+                    {"ty": "ScalarInt", "val": 5},
+                    {"ty": "ScalarInt", "val": 5},
+                    {"ty": "Add"},
+                ]
+            }
+        ]
+    }
+
+    program = caoc.compile_from_dict(program, caoc.CompilationOptions())
+
+    caoc.run(program)
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_compile_from_dict_non_str_keys(monkeypatch, use_orjson):
+    if use_orjson:
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(caoc, "_orjson", None)
+
+    program = {"lanes": [{"cards": [{"ty": "ScalarInt", "val": 1}]}], 1: None}
+
+    caoc.run(caoc.compile_from_dict(program))
+
+
+@pytest.mark.parametrize("buffer_type", [bytes, bytearray, memoryview])
+def test_parse_bytes(buffer_type):
+    PROGRAM_JSON = b'{"lanes": [{"cards": [{"ty": "ScalarInt", "val": 2}]}]}'
+    caoc.CompilationUnit.from_json.cache_clear()
+
+    program = caoc.CompilationUnit.from_json(buffer_type(PROGRAM_JSON))
+    program = caoc.compile(program, caoc.CompilationOptions())
+
+    caoc.run(program)
+
+
+def test_parse_rejects_non_text():
+    with pytest.raises(TypeError):
+        caoc.CompilationUnit.from_json(10 ** 9)
+    with pytest.raises(TypeError):
+        caoc.CompilationUnit.from_yaml(5)
+
+
+def test_compile_many():
+    units = [
+        caoc.CompilationUnit.from_json(
+            '{"lanes": [{"cards": [{"ty": "ScalarInt", "val": %d}]}]}' % i
+        )
+        for i in range(4)
+    ]
+
+    programs = caoc.compile_many(units, caoc.CompilationOptions())
+
+    assert len(programs) == len(units)
+    for program in programs:
+        caoc.run(program)
+
+
+def test_compile_many_reports_failing_unit():
+    units = [
+        caoc.CompilationUnit.from_json('{"lanes": [{"cards": [{"ty": "Pass"}]}]}'),
+        caoc.CompilationUnit.from_json('{"lanes": []}'),
+    ]
+
+    with pytest.raises(ValueError, match="unit 1"):
+        caoc.compile_many(units, caoc.CompilationOptions())
+
+
+SCALAR_INT_YAML = """
+lanes:
+    - cards:
+        - ty: ScalarInt
+          val: %s
+"""
+
+
+@pytest.mark.skipif(caoc._YamlLoader is None, reason="PyYAML is not installed")
+@pytest.mark.parametrize(
+    "scalar, expected", [("5", 5), ("+5", 5), ("010", 10), ("0o17", 15), ("0x1F", 31)]
+)
+def test_yaml_ints_match_native_parser(scalar, expected):
+    """
+    The libyaml fast path must resolve scalars by YAML 1.2, like the native parser
+    """
+    import yaml
+
+    source = SCALAR_INT_YAML % scalar
+
+    program = yaml.load(source, Loader=caoc._YamlLoader)
+    assert program["lanes"][0]["cards"][0]["val"] == expected
+
+    caoc.CompilationUnit.from_yaml(source)
+    caoc.CompilationUnit.from_yaml_bytes(source.encode())
+
+
+@pytest.mark.parametrize("scalar", ["1:30", "1_000", "0b101"])
+def test_yaml_1_1_ints_are_rejected(scalar):
+    source = SCALAR_INT_YAML % scalar
+
+    with pytest.raises(ValueError):
+        caoc.CompilationUnit.from_yaml_bytes(source.encode())
+    with pytest.raises(ValueError):
+        caoc.CompilationUnit.from_yaml(source)
+
+
+STRING_FIELD_YAMLS = [
+    """
+lanes:
+    - cards:
+        - ty: StringLiteral
+          val: %s
+""",
+    """
+lanes:
+    - name: %s
+""",
+    """
+lanes:
+    - arguments: [%s]
+""",
+    """
+lanes:
+    - cards:
+        - ty: Jump
+          val:
+            LaneName: %s
+""",
+]
+
+
+@pytest.mark.parametrize("template", STRING_FIELD_YAMLS)
+@pytest.mark.parametrize("scalar", ["123", "true", "null", "0x10"])
+def test_yaml_plain_scalars_in_string_fields_match_native_parser(template, scalar):
+    """
+    The native parser reads plain scalars as text where it expects a string, while
+    PyYAML has already typed them
+    """
+    source = template % scalar
+
+    caoc.CompilationUnit.from_yaml_bytes(source.encode())
+    caoc.CompilationUnit.from_yaml(source)
+
+
+def test_yaml_duplicate_keys_are_rejected():
+    source = """
+lanes:
+    - cards:
+        - ty: ScalarInt
+          val: 1
+          val: 2
+"""
+
+    with pytest.raises(ValueError):
+        caoc.CompilationUnit.from_yaml_bytes(source.encode())
+    with pytest.raises(ValueError):
+        caoc.CompilationUnit.from_yaml(source)
+
+
+def test_invalid_yaml_raises_value_error():
+    with pytest.raises(ValueError):
+        caoc.CompilationUnit.from_yaml("lanes: [")
+
+
+@pytest.mark.skipif(caoc._YamlLoader is None, reason="PyYAML is not installed")
+def test_invalid_program_in_valid_yaml_falls_back_to_native_parser(monkeypatch):
+    calls = []
+
+    def native_from_yaml(payload):
+        calls.append(payload)
+        raise ValueError("native parser")
+
+    monkeypatch.setattr(caoc, "_native_from_yaml", native_from_yaml)
+    monkeypatch.setattr(caoc, "_native_from_yaml_bytes", native_from_yaml)
+
+    with pytest.raises(ValueError, match="native parser"):
+        caoc.CompilationUnit.from_yaml(b"lanes: 5")
+
+    assert calls == [b"lanes: 5"]
@@ -9,6 +9,7 @@ setup(
         RustExtension("cao_lang.cao_lang_py", "py/Cargo.toml", binding=Binding.PyO3)
     ],
     packages=["cao_lang"],
+    extras_require={"fast": ["orjson>=3.4", "pyyaml"]},
     package_dir={"": "py"},
     # rust extensions are not zip safe, just like C-extensions.
     zip_safe=False,